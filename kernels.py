@@ -0,0 +1,135 @@
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# calculation kernels
+#
+# Every backend provides two kernels:
+#
+# waveforms(U0, Uangle, I0, Iangle, phi, dtype) takes a single voltage and
+# current phasor and a 1-D array of instantaneous phase angles and returns
+# the instantaneous voltage, current and power waveforms together with the
+# active power, reactive power and power factor of the phasors, in that
+# order. The waveforms are display buffers in the requested dtype, the
+# active power, reactive power and power factor are float64 scalars.
+#
+# power(U0, Uangle, I0, Iangle) takes arrays of phasor parameters that
+# broadcast to a common shape and returns float64 arrays of that shape with
+# the active power, reactive power and power factor, for parameter sweeps.
+
+Kernel = namedtuple('Kernel', ['waveforms', 'power'])
+
+PRECISIONS = {
+    'float32': np.float32,
+    'float64': np.float64,
+    }
+
+COMPLEX_DTYPES = {
+    np.float32: np.complex64,
+    np.float64: np.complex128,
+    }
+
+
+def phasor_power(U0, Uangle, I0, Iangle):
+    # active power, reactive power and power factor of a single phasor pair
+    S0 = U0 * np.exp(1j*Uangle) * np.conj(I0 * np.exp(1j*Iangle))
+    P = float(np.real(S0))
+    Q = float(np.imag(S0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pf = float(np.float64(P) / np.abs(S0))
+    return P, Q, pf
+
+
+def waveforms_numpy(U0, Uangle, I0, Iangle, phi, dtype=np.float64):
+    ctype = COMPLEX_DTYPES[np.dtype(dtype).type]
+    rotation = np.exp(1j*np.asarray(phi, dtype=dtype))
+
+    Uphasor = U0 * np.exp(1j*Uangle)
+    Iphasor = I0 * np.exp(1j*Iangle)
+    S0 = Uphasor * np.conj(Iphasor)
+
+    U = ctype(Uphasor) * rotation
+    I = ctype(Iphasor) * rotation
+    S = ctype(S0) + U * I
+
+    P, Q, pf = phasor_power(U0, Uangle, I0, Iangle)
+    return np.real(U), np.real(I), np.real(S), P, Q, pf
+
+
+def power_numpy(U0, Uangle, I0, Iangle):
+    S0 = U0 * np.exp(1j*np.asarray(Uangle, dtype=np.float64)) * \
+        np.conj(I0 * np.exp(1j*np.asarray(Iangle, dtype=np.float64)))
+    P = S0.real.copy()
+    Q = S0.imag.copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pf = P / np.abs(S0)
+    return P, Q, pf
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _waveforms_numba(U0, Uangle, I0, Iangle, phi, u, i, s):
+        UI = U0 * I0
+        P = UI * np.cos(Uangle - Iangle)
+        for k in numba.prange(phi.shape[0]):
+            Uphi = Uangle + phi[k]
+            Iphi = Iangle + phi[k]
+            u[k] = U0 * np.cos(Uphi)
+            i[k] = I0 * np.cos(Iphi)
+            s[k] = P + UI * np.cos(Uphi + Iphi)
+
+    @numba.njit(parallel=True, cache=True, error_model='numpy')
+    def _power_numba(U0, Uangle, I0, Iangle, P, Q, pf):
+        # inputs may be broadcast views, indexed through their strides
+        for r in numba.prange(P.shape[0]):
+            for c in range(P.shape[1]):
+                UI = U0[r, c] * I0[r, c]
+                delta = Uangle[r, c] - Iangle[r, c]
+                P[r, c] = UI * np.cos(delta)
+                Q[r, c] = UI * np.sin(delta)
+                pf[r, c] = P[r, c] / np.abs(UI)
+
+    def _as_2d(a):
+        # view of a as a 2-D array, keeping broadcast strides where possible
+        return a.reshape((-1,) + a.shape[-1:]) if a.ndim else a.reshape(1, 1)
+
+    def waveforms_numba(U0, Uangle, I0, Iangle, phi, dtype=np.float64):
+        # the kernel is specialised on dtype, so float32 waveforms are
+        # computed in float32 without up-casting phi
+        dtype = np.dtype(dtype).type
+        phi = np.asarray(phi, dtype=dtype)
+        u, i, s = [np.empty(phi.shape, dtype=dtype) for _ in range(3)]
+        _waveforms_numba(
+            dtype(U0), dtype(Uangle), dtype(I0), dtype(Iangle), phi, u, i, s)
+        P, Q, pf = phasor_power(U0, Uangle, I0, Iangle)
+        return u, i, s, P, Q, pf
+
+    def power_numba(U0, Uangle, I0, Iangle):
+        args = [np.asarray(a, dtype=np.float64)
+                for a in (U0, Uangle, I0, Iangle)]
+        shape = np.broadcast_shapes(*[a.shape for a in args])
+        args = [_as_2d(np.broadcast_to(a, shape)) for a in args]
+        out = [np.empty(shape) for _ in range(3)]
+        _power_numba(*args, *[_as_2d(o) for o in out])
+        return tuple(out)
+
+
+BACKENDS = {'numpy': Kernel(waveforms_numpy, power_numpy)}
+if numba is not None:
+    BACKENDS['numba'] = Kernel(waveforms_numba, power_numba)
+
+DEFAULT_BACKEND = 'numba' if 'numba' in BACKENDS else 'numpy'
+
+
+def get_backend(name=None):
+    # return the kernels for the given backend, falling back to NumPy when
+    # the requested backend is not available
+    if name is None:
+        name = DEFAULT_BACKEND
+    return BACKENDS.get(name, BACKENDS['numpy'])
@@ -1,11 +1,16 @@
 import sys
+from contextlib import closing
+
 import numpy as np
 import pyqtgraph as pg
 
 from PyQt5 import uic
-from PyQt5.QtCore import QThread, QTimer, pyqtSignal, Qt
+from PyQt5.QtCore import QRectF, QThread, QTimer, pyqtSignal, Qt
 from PyQt5.QtWidgets import QApplication, QMainWindow
 
+import kernels
+import sweep
+
 # Switch to using white background and black foreground
 # pg.setConfigOption('background', 'w')
 # pg.setConfigOption('foreground', 'k')
@@ -38,6 +43,29 @@ class playbackThread(QThread):
         self.steptimer.stop()
 
 
+class sweepThread(QThread):
+
+    sig_tile = pyqtSignal(int)
+
+    def __init__(self, grid):
+        QThread.__init__(self)
+        self.grid = grid
+        self.stopped = False
+
+    def __del__(self):
+        self.wait()
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self):
+        with closing(self.grid.run()) as tiles:
+            for n, _ in enumerate(tiles, start=1):
+                if self.stopped:
+                    break
+                self.sig_tile.emit(n)
+
+
 class PowerPlotApp(QMainWindow):
 
     RESET_ANIMATION = np.array(
@@ -46,6 +74,14 @@ class PowerPlotApp(QMainWindow):
         in np.linspace(-2, 2, 30)]
         )
 
+    SWEEP_AXES = ['angle', 'amplitude']
+    SWEEP_LEVELS = {
+        'P': (-1, 1),
+        'Q': (-1, 1),
+        'pf': (-1, 1),
+        'S': (0, 1),
+        }
+
     # calculation functions
     def U(self,
             U0=None,
@@ -138,6 +174,9 @@ class PowerPlotApp(QMainWindow):
         uic.loadUi('powerplots.ui', self)
         self.show()
 
+        # dtype of the display buffers, reported values stay float64
+        self.dtype = kernels.PRECISIONS[self.display_precision.currentText()]
+
         # initialize calculation values
         self.U0 = 0
         self.Uangle_deg = 0
@@ -155,8 +194,19 @@ class PowerPlotApp(QMainWindow):
         self.S1complex = 0 + 0j
         self.Scomplex = 0 + 0j
 
+        self.Uwaveform = 0
+        self.Iwaveform = 0
+        self.Swaveform = 0
+        self.P = 0
+        self.Q = 0
+        self.pf = 0
+
+        # fused calculation kernels, NumPy if no JIT backend is installed
+        self.kernel = kernels.get_backend()
+
         self.init_phasor_plot()
         self.init_sinewave_plot()
+        self.init_sweep_plot()
 
         self.inst_phi_deg = 0
         self.inst_phi_rad = 0
@@ -224,9 +274,23 @@ class PowerPlotApp(QMainWindow):
             self.reset_instantaneous_phase
             )
 
+        # signal connectors for display_precision
+        self.display_precision.currentIndexChanged.connect(
+            self.display_precision_changed
+            )
+
+        # signal connectors for parameter sweep
+        self.sweep_button.clicked.connect(self.start_sweep)
+
         # initialize playback thread
         self.playback_thread = playbackThread()
 
+        # parameter sweep state, refreshed while tiles are being computed
+        self.sweep_grid = None
+        self.sweep_thread = None
+        self.sweep_timer = QTimer(self)
+        self.sweep_timer.timeout.connect(self.refresh_sweep_plot)
+
     def voltage_amplitude_changed(self):
         self.U0 = self.voltage_amplitude.value() / 100
         self.update_calculations()
@@ -291,6 +355,13 @@ class PowerPlotApp(QMainWindow):
             )
         self.update_plots()
 
+    def display_precision_changed(self):
+        self.dtype = kernels.PRECISIONS[self.display_precision.currentText()]
+        self.deg_range = self.deg_range.astype(self.dtype)
+        self.phi_range = self.deg_range/180*np.pi
+        self.update_calculations()
+        self.update_plots()
+
     def playback_speed_changed(self):
         self.playback_stepsize = 10 ** (self.playback_speed.value() / 50) / 10
 
@@ -340,7 +411,7 @@ class PowerPlotApp(QMainWindow):
             self.apparent_power.setValue(S*100)
             self.apparent_power.blockSignals(False)
 
-        P = np.real(self.S0complex)
+        P = self.P
         self.active_power_display.setText(
             "{:0.2f}".format(P)
             )
@@ -349,7 +420,7 @@ class PowerPlotApp(QMainWindow):
             self.active_power.setValue(P*100)
             self.active_power.blockSignals(False)
 
-        Q = np.imag(self.S0complex)
+        Q = self.Q
         self.reactive_power_display.setText(
             "{:0.2f}".format(Q)
             )
@@ -358,7 +429,7 @@ class PowerPlotApp(QMainWindow):
             self.reactive_power.setValue(Q*100)
             self.reactive_power.blockSignals(False)
 
-        pf = P / S
+        pf = self.pf
         indcap = ""
         if P*Q > 0:
             indcap = " IND"
@@ -506,7 +577,8 @@ class PowerPlotApp(QMainWindow):
             )
 
         x_range = self.sinewave_plot.getAxis('bottom').range
-        self.deg_range = np.arange(x_range[0], x_range[1], step=1)
+        self.deg_range = np.arange(
+            x_range[0], x_range[1], step=1, dtype=self.dtype)
         # self.phi = np.arange(-np.pi, 3*np.pi, 4*np.pi/1000)
         self.phi_range = self.deg_range/180*np.pi
         # self.deg = self.phi/np.pi*180
@@ -544,12 +616,151 @@ class PowerPlotApp(QMainWindow):
             pen=pg.mkPen('g', width=2, style=Qt.DotLine),
             )
 
+    def init_sweep_plot(self):
+        self.sweep_plot.setTitle('Parameter sweep')
+        self.sweep_plot.showGrid(x=True, y=True)
+        self.sweep_plot.disableAutoRange()
+
+        self.sweep_image = pg.ImageItem(axisOrder='row-major')
+        self.sweep_image.setAutoDownsample(True)
+        self.sweep_image.setColorMap(pg.colormap.get('viridis'))
+        self.sweep_plot.addItem(self.sweep_image)
+
+        self.sweep_marker = pg.ScatterPlotItem(
+            symbol='+',
+            size=20,
+            pen=pg.mkPen('w', width=2),
+            )
+        self.sweep_plot.addItem(self.sweep_marker)
+
+        self.set_sweep_axes(self.SWEEP_AXES[self.sweep_axes.currentIndex()])
+
+    def set_sweep_axes(self, axes):
+        self.sweep_axes_shown = axes
+        if axes == 'angle':
+            self.sweep_plot.setLabel(
+                'bottom', text='Voltage angle', units='degree')
+            self.sweep_plot.setLabel(
+                'left', text='Current angle', units='degree')
+            self.sweep_plot.getAxis('bottom').setTickSpacing(
+                major=90, minor=30)
+            self.sweep_plot.getAxis('left').setTickSpacing(
+                major=90, minor=30)
+            vmin, vmax = -180, 180
+        else:
+            self.sweep_plot.setLabel(
+                'bottom', text='Voltage amplitude', units='p.u.')
+            self.sweep_plot.setLabel(
+                'left', text='Current amplitude', units='p.u.')
+            self.sweep_plot.getAxis('bottom').setTickSpacing(
+                major=.5, minor=.1)
+            self.sweep_plot.getAxis('left').setTickSpacing(
+                major=.5, minor=.1)
+            vmin, vmax = 0, 1
+        self.sweep_rect = QRectF(vmin, vmin, vmax - vmin, vmax - vmin)
+        self.sweep_plot.setXRange(min=vmin, max=vmax)
+        self.sweep_plot.setYRange(min=vmin, max=vmax)
+
+    def start_sweep(self):
+        if self.sweep_grid is not None:
+            self.sweep_image.clear()
+            self.sweep_grid.close()
+
+        quantity = self.sweep_quantity.currentText()
+        axes = self.SWEEP_AXES[self.sweep_axes.currentIndex()]
+        self.sweep_grid = sweep.GridSweep(
+            quantity=quantity,
+            axes=axes,
+            params={
+                'U0': self.U0,
+                'Uangle': self.Uangle_rad,
+                'I0': self.I0,
+                'Iangle': self.Iangle_rad,
+                },
+            resolution=self.sweep_resolution.value(),
+            dtype=self.dtype,
+            )
+        self.sweep_tiles = len(self.sweep_grid.tiles())
+
+        self.set_sweep_axes(axes)
+        self.sweep_plot.setTitle('Parameter sweep: {}'.format(quantity))
+        self.sweep_image.setImage(
+            self.sweep_grid.result,
+            levels=self.SWEEP_LEVELS[quantity],
+            )
+        self.sweep_image.setRect(self.sweep_rect)
+        self.update_sweep_marker()
+
+        self.sweep_button.setText('Cancel')
+        self.sweep_button.clicked.disconnect(self.start_sweep)
+        self.sweep_button.clicked.connect(self.cancel_sweep)
+        self.sweep_thread = sweepThread(self.sweep_grid)
+        self.sweep_thread.sig_tile.connect(self.sweep_tile_done)
+        self.sweep_thread.finished.connect(self.sweep_finished)
+        self.sweep_thread.start()
+        self.sweep_timer.start(100)
+
+    def sweep_tile_done(self, n):
+        self.statusbar.showMessage(
+            'Sweep: {}/{} tiles'.format(n, self.sweep_tiles)
+            )
+
+    def refresh_sweep_plot(self):
+        # tiles are written in place by the workers, only redraw here
+        self.sweep_image.updateImage()
+
+    def cancel_sweep(self):
+        self.sweep_button.setEnabled(False)
+        self.sweep_thread.stop()
+
+    def sweep_finished(self):
+        self.sweep_timer.stop()
+        self.refresh_sweep_plot()
+        self.sweep_button.setText('Sweep')
+        self.sweep_button.clicked.disconnect(self.cancel_sweep)
+        self.sweep_button.clicked.connect(self.start_sweep)
+        self.sweep_button.setEnabled(True)
+        if self.sweep_thread.stopped:
+            self.statusbar.showMessage('Sweep cancelled', 3000)
+        else:
+            self.statusbar.showMessage('Sweep done', 3000)
+
+    def closeEvent(self, event):
+        if self.sweep_thread is not None:
+            self.sweep_thread.stop()
+            self.sweep_thread.wait()
+        if self.sweep_grid is not None:
+            self.sweep_image.clear()
+            self.sweep_grid.close()
+            self.sweep_grid = None
+        super(PowerPlotApp, self).closeEvent(event)
+
+    def update_sweep_marker(self):
+        if self.sweep_axes_shown == 'angle':
+            x, y = self.Uangle_deg, self.Iangle_deg
+        else:
+            x, y = self.U0, self.I0
+        self.sweep_marker.setData(x=[x], y=[y])
+
     def update_calculations(self):
+        # waveforms and power values in a single pass
+        phi_waveform = self.phi_range + self.dtype(self.inst_phi_rad)
+        (self.Uwaveform, self.Iwaveform, self.Swaveform,
+         self.P, self.Q, self.pf) = self.kernel.waveforms(
+            self.U0,
+            self.Uangle_rad,
+            self.I0,
+            self.Iangle_rad,
+            phi_waveform,
+            dtype=self.dtype,
+            )
+
+        # phasors at the instantaneous phase angle, S0 = U * conj(I)
         self.Ucomplex = self.U()
         self.Icomplex = self.I()
-        self.S0complex = self.S0()
-        self.S1complex = self.S1()
-        self.Scomplex = self.S()
+        self.S0complex = self.P + 1j*self.Q
+        self.S1complex = self.Ucomplex * self.Icomplex
+        self.Scomplex = self.S0complex + self.S1complex
 
     def update_plots(self):
         # plot phasor lines
@@ -605,24 +816,19 @@ class PowerPlotApp(QMainWindow):
         # self.phasor_values['Q'].set_ydata(np.imag(S(inst_phi_rad))*np.ones(2))
 
         # update sinewave lines
-        phi_waveform = self.phi_range + self.inst_phi_rad
-
-        Uwaveform = np.real(self.U(phi=phi_waveform))
         self.sinewave_lines['U'].setData(
             x=self.deg_range,
-            y=Uwaveform,
+            y=self.Uwaveform,
             )
 
-        Iwaveform = np.real(self.I(phi=phi_waveform))
         self.sinewave_lines['I'].setData(
             x=self.deg_range,
-            y=Iwaveform,
+            y=self.Iwaveform,
             )
 
-        Swaveform = np.real(self.S(phi=phi_waveform))
         self.sinewave_lines['S'].setData(
             x=self.deg_range,
-            y=Swaveform,
+            y=self.Swaveform,
             )
 
         self.sinewave_valuelines['U'].setValue(
@@ -635,6 +841,8 @@ class PowerPlotApp(QMainWindow):
             v=np.real(self.Scomplex),
             )
 
+        self.update_sweep_marker()
+
     def reset_instantaneous_phase(self, phase=0):
         self.playback_button.clicked.disconnect(self.start_playback)
         self.playback_thread.sig_step.connect(
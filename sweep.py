@@ -0,0 +1,130 @@
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+
+import kernels
+
+
+# quantities that can be swept, as computed from the kernel outputs
+QUANTITIES = {
+    'P': lambda P, Q, pf: P,
+    'Q': lambda P, Q, pf: Q,
+    'pf': lambda P, Q, pf: pf,
+    'S': lambda P, Q, pf: np.hypot(P, Q),
+    }
+
+# swept parameters (x, y) and their range for each sweep type
+AXES = {
+    'angle': (('Uangle', 'Iangle'), (-np.pi, np.pi)),
+    'amplitude': (('U0', 'I0'), (0, 1)),
+    }
+
+TILE_SIZE = 500
+
+
+class GridSweep:
+
+    def __init__(self,
+            quantity,
+            axes,
+            params,
+            resolution,
+            tile_size=TILE_SIZE,
+            dtype=np.float64,
+            ):
+        self.quantity = quantity
+        self.axes = axes
+        self.params = dict(params)
+        self.shape = (resolution, resolution)
+        self.tile_size = tile_size
+        self.dtype = dtype
+
+        _, (vmin, vmax) = AXES[axes]
+        self.x = np.linspace(vmin, vmax, resolution)
+        self.y = np.linspace(vmin, vmax, resolution)
+
+        # result array lives in shared memory, so the workers write their
+        # tiles in place and only the tile bounds travel back
+        self._shm = shared_memory.SharedMemory(
+            create=True,
+            size=int(np.prod(self.shape)) * np.dtype(dtype).itemsize,
+            )
+        self.result = np.ndarray(
+            self.shape, dtype=dtype, buffer=self._shm.buf)
+        self.result.fill(np.nan)
+
+    def tiles(self):
+        ny, nx = self.shape
+        return [
+            (y0, min(y0 + self.tile_size, ny),
+             x0, min(x0 + self.tile_size, nx))
+            for y0 in range(0, ny, self.tile_size)
+            for x0 in range(0, nx, self.tile_size)
+            ]
+
+    def run(self, processes=None):
+        # yield the bounds of each tile as soon as it has been written,
+        # closing the generator early terminates the pool
+        #
+        # workers are spawned rather than forked, as this runs from a
+        # non-main thread of a process that may already use Numba's threads
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(
+                processes=processes,
+                initializer=_init_worker,
+                initargs=(
+                    self._shm.name,
+                    self.shape,
+                    self.dtype,
+                    self.quantity,
+                    self.axes,
+                    self.params,
+                    self.x,
+                    self.y,
+                    ),
+                ) as pool:
+            for tile in pool.imap_unordered(_compute_tile, self.tiles()):
+                yield tile
+
+    def close(self):
+        self.result = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+# worker process state, set up once per process by _init_worker
+_worker = {}
+
+
+def _init_worker(name, shape, dtype, quantity, axes, params, x, y):
+    # every process in the pool already runs on its own core
+    if kernels.numba is not None:
+        kernels.numba.set_num_threads(1)
+
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['result'] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker['quantity'] = QUANTITIES[quantity]
+    _worker['names'], _ = AXES[axes]
+    _worker['params'] = params
+    _worker['x'] = x
+    _worker['y'] = y
+    _worker['kernel'] = kernels.get_backend()
+
+
+def _compute_tile(tile):
+    y0, y1, x0, x1 = tile
+    xname, yname = _worker['names']
+
+    params = dict(_worker['params'])
+    params[xname] = _worker['x'][np.newaxis, x0:x1]
+    params[yname] = _worker['y'][y0:y1, np.newaxis]
+
+    P, Q, pf = _worker['kernel'].power(
+        params['U0'],
+        params['Uangle'],
+        params['I0'],
+        params['Iangle'],
+        )
+    _worker['result'][y0:y1, x0:x1] = _worker['quantity'](P, Q, pf)
+    return tile
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import kernels
+
+
+TOLERANCE = {
+    np.float32: 1e-5,
+    np.float64: 1e-12,
+    }
+
+
+def numba_backend():
+    pytest.importorskip('numba')
+    return kernels.BACKENDS['numba']
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('U0, Uangle, I0, Iangle', [
+    (1.0, 0.0, 0.5, 0.0),
+    (0.8, 0.7, 0.3, -2.1),
+    (0.25, -3.0, 1.0, 1.5),
+    ])
+def test_waveforms_backends_match(U0, Uangle, I0, Iangle, dtype):
+    # scalar phasors and a waveform vector, as in update_calculations
+    phi = np.arange(-180, 540, dtype=dtype) / 180 * np.pi + dtype(0.3)
+    expected = kernels.waveforms_numpy(U0, Uangle, I0, Iangle, phi, dtype)
+    result = numba_backend().waveforms(U0, Uangle, I0, Iangle, phi, dtype)
+
+    for r, e in zip(result[:3], expected[:3]):
+        assert r.dtype == e.dtype == dtype
+        assert np.allclose(r, e, atol=TOLERANCE[dtype])
+    assert np.allclose(result[3:], expected[3:])
+
+
+@pytest.mark.parametrize('xname, yname, vmin, vmax', [
+    ('Uangle', 'Iangle', -np.pi, np.pi),
+    ('U0', 'I0', 0, 1),
+    ])
+def test_power_backends_match(xname, yname, vmin, vmax):
+    # 2-D broadcast of a row and a column, as in sweep._compute_tile
+    params = {'U0': 0.9, 'Uangle': 0.4, 'I0': 0.6, 'Iangle': -1.2}
+    params[xname] = np.linspace(vmin, vmax, 70)[np.newaxis, :]
+    params[yname] = np.linspace(vmin, vmax, 50)[:, np.newaxis]
+    args = [params[name] for name in ('U0', 'Uangle', 'I0', 'Iangle')]
+
+    expected = kernels.power_numpy(*args)
+    result = numba_backend().power(*args)
+
+    for r, e in zip(result, expected):
+        assert r.shape == e.shape == (50, 70)
+        assert np.allclose(r, e, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_zero_amplitude_power_factor(dtype):
+    phi = np.linspace(0, 2*np.pi, 360, dtype=dtype)
+    backends = [kernels.BACKENDS['numpy']]
+    if 'numba' in kernels.BACKENDS:
+        backends.append(kernels.BACKENDS['numba'])
+
+    for backend in backends:
+        *_, P, Q, pf = backend.waveforms(0.0, 0.3, 1.0, 0.1, phi, dtype)
+        assert P == Q == 0
+        assert np.isnan(pf)
+
+        P, Q, pf = backend.power(
+            np.array([0.0, 1.0]), 0.3, np.array([[1.0], [0.0]]), 0.1)
+        assert np.isnan(pf).tolist() == [[True, False], [True, True]]
+
+
+def test_backends_return_same_kind():
+    phi = np.linspace(0, 2*np.pi, 360, dtype=np.float32)
+    backends = [kernels.BACKENDS['numpy'], numba_backend()]
+
+    for backend in backends:
+        u, i, s, P, Q, pf = backend.waveforms(
+            0.9, 0.4, 0.6, -1.2, phi, np.float32)
+        assert all(w.dtype == np.float32 for w in (u, i, s))
+        assert all(type(v) is float for v in (P, Q, pf))
+
+        for v in backend.power(
+                np.linspace(0, 1, 4), 0.4, 0.6, np.zeros((3, 1))):
+            assert v.dtype == np.float64
+            assert v.shape == (3, 4)
+            assert v.flags.writeable